@@ -2,9 +2,14 @@
 Authentication API routes
 """
 
+import asyncio
+import re
+
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, field_validator
 from typing import Optional
 
 from app.db.database import get_db
@@ -18,17 +23,32 @@ from app.core.security import (
 
 router = APIRouter()
 
+# Shape check for emails, compiled once; replaces EmailStr and its
+# per-call email-validator parsing
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
 
 # Pydantic schemas
-class UserRegister(BaseModel):
-    email: EmailStr
+class UserCredentials(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    email: str
     password: str
+    
+    @field_validator("email")
+    @classmethod
+    def check_email(cls, value: str) -> str:
+        if not EMAIL_PATTERN.match(value):
+            raise ValueError("value is not a valid email address")
+        return value
+
+
+class UserRegister(UserCredentials):
     name: str
 
 
-class UserLogin(BaseModel):
-    email: EmailStr
-    password: str
+class UserLogin(UserCredentials):
+    pass
 
 
 class Token(BaseModel):
@@ -50,31 +70,31 @@ class UserResponse(BaseModel):
 async def register(user_data: UserRegister, db: Session = Depends(get_db)):
     """Register a new user"""
     
-    # Check if user already exists
-    existing_user = db.query(models.User).filter(
-        models.User.email == user_data.email
-    ).first()
-    
-    if existing_user:
+    # Create new user; the unique index on users.email rejects duplicates
+    # in the same round trip instead of a separate SELECT beforehand
+    hashed_password = await asyncio.to_thread(get_password_hash, user_data.password)
+    
+    # Core insert: only the new id is needed, so skip building an ORM object
+    # and the refresh SELECT that would follow the commit
+    try:
+        result = db.execute(
+            insert(models.User).values(
+                email=user_data.email,
+                name=user_data.name,
+                hashed_password=hashed_password
+            )
+        )
+        db.commit()
+    except IntegrityError:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-    
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
-    new_user = models.User(
-        email=user_data.email,
-        name=user_data.name,
-        hashed_password=hashed_password
-    )
-    
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    user_id = result.inserted_primary_key[0]
     
     # Create access token
-    access_token = create_access_token(data={"sub": str(new_user.id)})
+    access_token = create_access_token(data={"sub": str(user_id)})
     
     return {
         "access_token": access_token,
@@ -86,12 +106,18 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
 async def login(credentials: UserLogin, db: Session = Depends(get_db)):
     """Login user"""
     
-    # Find user
-    user = db.query(models.User).filter(
-        models.User.email == credentials.email
+    # Find user; a Core select of the two needed columns avoids loading an
+    # ORM instance into the identity map just to compare a hash
+    user = db.execute(
+        select(models.User.id, models.User.hashed_password).where(
+            models.User.email == credentials.email
+        )
     ).first()
     
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    # Hashing is CPU-bound, so keep it off the event loop
+    if not user or not await asyncio.to_thread(
+        verify_password, credentials.password, user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -149,7 +175,7 @@ async def create_test_user(db: Session = Depends(get_db)):
         }
     
     # Create new test user
-    hashed_password = get_password_hash("testpassword123")
+    hashed_password = await asyncio.to_thread(get_password_hash, "testpassword123")
     new_user = models.User(
         email="test@meetnote.app",
         name="Test User",
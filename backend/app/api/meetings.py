@@ -13,15 +13,15 @@ import logging
 from app.db.database import get_db
 from app.db import models
 from app.core.security import get_current_user
-from app.services.whisper_service import WhisperService
-from app.services.ai_service import AIService
+from app.services.whisper_service import whisper_service
+from app.services.ai_service import ai_service
 from app.core.config import settings
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-whisper_service = WhisperService()
-ai_service = AIService()
+# Uploads are copied to disk in pieces of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 
 # Test endpoint without authentication for debugging
@@ -195,9 +195,22 @@ async def upload_audio(
         audio_filename = f"meeting_{meeting_id}_{datetime.now().timestamp()}.webm"
         audio_path = os.path.join(settings.RECORDINGS_DIR, audio_filename)
         
+        # Stream the upload to disk so the whole recording is never held
+        # in memory, and stop as soon as it exceeds the size limit
+        received = 0
         with open(audio_path, "wb") as f:
-            content = await audio.read()
-            f.write(content)
+            while chunk := await audio.read(UPLOAD_CHUNK_SIZE):
+                received += len(chunk)
+                if received > settings.MAX_AUDIO_SIZE:
+                    break
+                f.write(chunk)
+        
+        if received > settings.MAX_AUDIO_SIZE:
+            os.unlink(audio_path)
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Audio file exceeds {settings.MAX_AUDIO_SIZE} bytes"
+            )
         
         meeting.audio_file_path = audio_path
         meeting.status = "processing"
@@ -241,6 +254,8 @@ async def upload_audio(
             "summary": ai_summary
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing audio for meeting {meeting_id}: {str(e)}")
         meeting.status = "failed"
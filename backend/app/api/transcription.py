@@ -6,9 +6,15 @@ from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from typing import Optional
 import logging
+import os
+import random
+import time
 import uuid
 from datetime import datetime
 
+from app.core.config import settings
+from app.services.meeting_writer import meeting_writer
+
 # Try to import lightweight Whisper, fall back to mock if not available
 try:
     from app.services.lightweight_whisper import lightweight_whisper
@@ -20,6 +26,15 @@ except ImportError:
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Uncompressed formats carry 16-bit mono PCM at settings.SAMPLE_RATE; the
+# compressed ones are assumed to use MediaRecorder's default 128 kbps
+PCM_FORMATS = {"wav", "pcm"}
+COMPRESSED_BYTES_PER_SECOND = 128_000 // 8
+
+# Userspace PRNG for meeting ids, seeded once from the OS; ids only need
+# to be unique, not unpredictable
+_id_rng = random.Random(os.urandom(32))
+
 
 class AudioRequest(BaseModel):
     audio_data: str
@@ -35,35 +50,24 @@ async def transcribe_audio(request: AudioRequest, req: Request):
         logger.info(f"Received audio transcription request: {request.format}")
         logger.info(f"Audio data size: {len(request.audio_data)} characters")
         
-        # Generate meeting ID
-        meeting_id = str(uuid.uuid4())
+        # Generate meeting ID and timestamp from a single clock read
+        now_ns = time.time_ns()
+        meeting_id = str(_uuid7(now_ns))
+        created_at = datetime.fromtimestamp(now_ns / 1e9).isoformat(timespec="milliseconds")
         
-        # Estimate duration based on audio data size (rough approximation)
-        audio_size = len(request.audio_data)
-        estimated_duration = max(5, min(300, audio_size // 1000))
+        # Estimate duration from the decoded size without decoding
+        estimated_duration = _estimate_duration(request.audio_data, request.format)
         
-        # Try to use lightweight Whisper if available, otherwise use mock
-        if WHISPER_AVAILABLE and lightweight_whisper:
-            try:
-                # Initialize Whisper if not already done
-                if not lightweight_whisper.is_ready():
-                    await lightweight_whisper.initialize()
-                
-                # Use real Whisper transcription
-                whisper_result = await lightweight_whisper.transcribe_audio(request.audio_data)
-                transcript = whisper_result["transcript"]
-                confidence = whisper_result["confidence"]
-                estimated_duration = whisper_result["duration"]
-                summary = f"Whisper AI transcription for {estimated_duration}s recording"
-                
-                logger.info(f"✅ Used Whisper for transcription: {len(transcript)} chars")
-                
-            except Exception as e:
-                logger.warning(f"⚠️ Whisper failed, using mock: {e}")
-                # Fall back to mock transcription
-                transcript, summary, confidence = _generate_mock_transcript(estimated_duration)
+        # Use lightweight Whisper if available, otherwise fall back to mock
+        whisper_result = await _transcribe_with_whisper(request.audio_data)
+        if whisper_result:
+            transcript = whisper_result["transcript"]
+            confidence = whisper_result["confidence"]
+            estimated_duration = whisper_result["duration"]
+            summary = f"Whisper AI transcription for {estimated_duration}s recording"
+            
+            logger.info(f"✅ Used Whisper for transcription: {len(transcript)} chars")
         else:
-            # Use mock transcription
             transcript, summary, confidence = _generate_mock_transcript(estimated_duration)
         
         # Create meeting object
@@ -76,25 +80,14 @@ async def transcribe_audio(request: AudioRequest, req: Request):
             "language": "en",
             "confidence": confidence,
             "audio_format": request.format,
-            "created_at": datetime.now().isoformat()
+            "created_at": created_at
         }
         
-        # Store in Supabase if available
-        if hasattr(req.app.state, 'supabase') and req.app.state.supabase:
-            try:
-                logger.info(f"🔄 Attempting to store meeting {meeting_id} in Supabase...")
-                response = req.app.state.supabase.table('meetings').insert(meeting).execute()
-                logger.info(f"📊 Supabase response: {response}")
-                
-                if response.data:
-                    logger.info(f"✅ Meeting {meeting_id} stored in Supabase successfully")
-                else:
-                    logger.error(f"❌ Failed to store meeting {meeting_id} - no data returned")
-                    logger.error(f"❌ Response details: {response}")
-            except Exception as db_error:
-                logger.error(f"💥 Database error storing meeting {meeting_id}: {db_error}")
-                logger.error(f"💥 Meeting data: {meeting}")
-                # Don't raise the error, just log it so the API still returns success
+        # Queue for Supabase; the background writer batches the inserts so
+        # the response doesn't wait on PostgREST
+        if meeting_writer.is_running():
+            await meeting_writer.enqueue(meeting)
+            logger.info(f"🔄 Queued meeting {meeting_id} for Supabase")
         else:
             logger.warning(f"⚠️ No Supabase client available for meeting {meeting_id}")
         
@@ -106,6 +99,55 @@ async def transcribe_audio(request: AudioRequest, req: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _uuid7(timestamp_ns: int) -> uuid.UUID:
+    """
+    Build a time-ordered UUIDv7 (RFC 9562)
+    
+    New meetings sort after existing ones, so inserts append to the end of
+    the primary key index instead of landing on random pages.
+    """
+    timestamp_ms = timestamp_ns // 1_000_000
+    rand = _id_rng.getrandbits(74)
+    value = (
+        (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80  # unix_ts_ms
+        | 0x7 << 76                              # version
+        | (rand >> 62) << 64                     # rand_a (12 bits)
+        | 0b10 << 62                             # variant
+        | rand & ((1 << 62) - 1)                 # rand_b (62 bits)
+    )
+    return uuid.UUID(int=value)
+
+
+async def _transcribe_with_whisper(audio_data: str) -> Optional[dict]:
+    """Transcribe with lightweight Whisper, or return None to use the mock"""
+    if not WHISPER_AVAILABLE or not lightweight_whisper:
+        return None
+    
+    try:
+        # Initialize Whisper if not already done
+        if not lightweight_whisper.is_ready() and not await lightweight_whisper.initialize():
+            return None
+        
+        return await lightweight_whisper.transcribe_audio(audio_data)
+    except Exception as e:
+        logger.warning(f"⚠️ Whisper failed, using mock: {e}")
+        return None
+
+
+def _estimate_duration(audio_data: str, audio_format: Optional[str]) -> int:
+    """Estimate recording length in seconds from the base64 payload size"""
+    # Every 4 base64 characters carry 3 bytes, minus the trailing padding
+    padding = 2 if audio_data.endswith("==") else 1 if audio_data.endswith("=") else 0
+    raw_len = (len(audio_data) * 3) // 4 - padding
+    
+    if audio_format in PCM_FORMATS:
+        bytes_per_second = settings.SAMPLE_RATE * 2
+    else:
+        bytes_per_second = COMPRESSED_BYTES_PER_SECOND
+    
+    return round(raw_len / bytes_per_second)
+
+
 def _generate_mock_transcript(estimated_duration: int) -> tuple[str, str, float]:
     """Generate mock transcript based on duration"""
     if estimated_duration < 30:
@@ -0,0 +1,51 @@
+"""
+Small in-process TTL cache for hot read endpoints
+"""
+
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+class TTLCache:
+    """Keep up to maxsize values for a fixed number of seconds"""
+
+    def __init__(self, ttl: float, maxsize: int = 128):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a cached value, or None once it has expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        return value
+
+    def set(self, key: str, value: Any):
+        """Store a value for ttl seconds, evicting to stay within maxsize"""
+        now = time.monotonic()
+        # Re-inserting moves the key to the end, so insertion order is age order
+        self._entries.pop(key, None)
+        if len(self._entries) >= self.maxsize:
+            self._evict(now)
+        self._entries[key] = (now + self.ttl, value)
+
+    def _evict(self, now: float):
+        """Drop expired entries, then the oldest ones until there is room"""
+        for key in [key for key, (expires_at, _) in self._entries.items() if now >= expires_at]:
+            del self._entries[key]
+        while len(self._entries) >= self.maxsize:
+            del self._entries[next(iter(self._entries))]
+
+    def clear(self):
+        """Drop every entry, e.g. after a write"""
+        self._entries.clear()
+
+
+# Meeting list polled by the dashboard; cleared whenever new meetings are stored
+# Cursor pages are keyed by client input, so maxsize bounds the memory they use
+meetings_cache = TTLCache(ttl=5, maxsize=256)
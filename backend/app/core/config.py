@@ -44,20 +44,38 @@ class Settings(BaseSettings):
     # Whisper Settings
     WHISPER_MODEL: str = os.getenv("WHISPER_MODEL", "base")  # tiny, base, small, medium, large
     WHISPER_DEVICE: str = os.getenv("WHISPER_DEVICE", "cpu")  # cpu or cuda
-    WHISPER_COMPUTE_TYPE: str = os.getenv("WHISPER_COMPUTE_TYPE", "int8")  # int8, float16, float32
+    WHISPER_COMPUTE_TYPE: str = os.getenv(
+        "WHISPER_COMPUTE_TYPE",
+        "int8_float16" if WHISPER_DEVICE == "cuda" else "int8"
+    )  # int8, int8_float16, float16, float32
+    WHISPER_CPU_THREADS: int = int(os.getenv("WHISPER_CPU_THREADS", "0"))  # 0 = cores / workers
+    WHISPER_NUM_WORKERS: int = int(os.getenv("WHISPER_NUM_WORKERS", "1"))  # concurrent transcriptions
+    WHISPER_BATCH_SIZE: int = int(os.getenv("WHISPER_BATCH_SIZE", "8"))  # max streaming chunks per batch
+    WHISPER_BATCH_WINDOW_MS: int = int(os.getenv("WHISPER_BATCH_WINDOW_MS", "20"))  # wait to fill a batch
+    WHISPER_FILE_BATCH_SIZE: int = int(os.getenv(
+        "WHISPER_FILE_BATCH_SIZE",
+        "8" if WHISPER_DEVICE == "cuda" else "1"
+    ))  # segments per batch for uploaded files (1 = sequential pipeline)
+    
+    # WebSocket Streaming
+    MAX_WS_CLIENTS: int = int(os.getenv("MAX_WS_CLIENTS", "16"))  # concurrent streams per worker
+    WS_QUEUE_SIZE: int = int(os.getenv("WS_QUEUE_SIZE", "8"))  # frames buffered per client
+    WS_FLUSH_MS: int = int(os.getenv("WS_FLUSH_MS", "30"))  # coalesce binary transcriptions (0 = send at once)
     
     # Audio Settings
     SAMPLE_RATE: int = 16000
     CHUNK_DURATION: int = 5  # seconds
     MAX_AUDIO_SIZE: int = 25 * 1024 * 1024  # 25MB
     
-    # CORS
-    CORS_ORIGINS: list = [
-        "http://localhost:3000",
-        "http://localhost:3001", 
-        "https://meetnoteapp.netlify.app",
-        "https://meetnote-app.netlify.app",  # Alternative domain
-    ]
+    # CORS: the only origin setting, overridable with the CORS_ORIGIN_REGEX
+    # env var. Covers the web apps, local dev servers and the extension;
+    # Starlette compares allow_origins literally, so extension ids
+    # (32 chars a-p) can only be matched by a regex
+    CORS_ORIGIN_REGEX: str = (
+        r"^(https://(meetnoteapp|meetnote-app)\.netlify\.app"
+        r"|http://localhost:(5173|3000|3001)"
+        r"|chrome-extension://[a-p]{32})$"
+    )
     
     # File Storage
     UPLOAD_DIR: str = "./uploads"
@@ -0,0 +1,11 @@
+"""
+Base64 decoding for audio payloads
+pybase64 decodes with SIMD when available and mirrors the stdlib API
+"""
+
+try:
+    from pybase64 import b64decode
+except ImportError:
+    from base64 import b64decode
+
+__all__ = ["b64decode"]
@@ -0,0 +1,56 @@
+"""
+Prometheus metrics for the streaming path
+No per-client labels, so series count stays fixed however many clients connect
+"""
+
+import os
+
+# prometheus-client is optional; without it the metrics are no-ops
+try:
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, make_asgi_app, multiprocess
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+
+class _NoopMetric:
+    """Stands in for a metric when prometheus-client is not installed"""
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def dec(self, amount: float = 1):
+        pass
+
+    def observe(self, amount: float):
+        pass
+
+
+if PROMETHEUS_AVAILABLE:
+    WS_CHUNKS = Counter("ws_chunks", "Audio frames received over WebSocket")
+    # livesum adds up the gauge across worker processes in multiprocess mode
+    WS_ACTIVE_CLIENTS = Gauge("ws_active_clients", "Connected WebSocket streams", multiprocess_mode="livesum")
+    TRANSCRIBE_LATENCY = Histogram(
+        "transcribe_latency_seconds",
+        "Time from submitting an utterance to getting its transcription",
+        buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0)
+    )
+else:
+    WS_CHUNKS = WS_ACTIVE_CLIENTS = TRANSCRIBE_LATENCY = _NoopMetric()
+
+
+def metrics_app():
+    """
+    ASGI app serving the metrics, or None without prometheus-client
+
+    With several worker processes each keeps its own counters; set
+    PROMETHEUS_MULTIPROC_DIR to a shared, empty directory so every worker
+    reports the combined values.
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return None
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return make_asgi_app(registry=registry)
+    return make_asgi_app()
@@ -3,10 +3,12 @@ Authentication utilities - JWT token handling
 """
 
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
-from jose import JWTError, jwt
+import time
+from jose import JWTError, jwk, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
@@ -14,9 +16,22 @@ from app.core.config import settings
 from app.db.database import get_db
 from app.db import models
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Argon2id for new hashes (libargon2 via argon2-cffi), tuned to stay under
+# ~50ms per hash; existing bcrypt hashes still verify and are deprecated
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__type="ID",
+    argon2__time_cost=2,
+    argon2__memory_cost=19456,  # KiB (19 MiB)
+    argon2__parallelism=1
+)
 security = HTTPBearer()
 
+# Build the signing key once; jose would otherwise reconstruct the HMAC
+# key object from the secret on every encode/decode
+_jwt_key = jwk.construct(settings.SECRET_KEY, settings.ALGORITHM)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
@@ -38,23 +53,31 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, _jwt_key, algorithm=settings.ALGORITHM)
     
     return encoded_jwt
 
 
+@lru_cache(maxsize=4096)
+def _verify_token(token: str) -> dict:
+    """Verify a token's signature; tokens are immutable, so claims are cached"""
+    # Expiry is checked by decode_token on every call instead, since a
+    # cached result outlives the moment it was verified
+    return jwt.decode(
+        token,
+        _jwt_key,
+        algorithms=[settings.ALGORITHM],
+        options={"verify_exp": False}
+    )
+
+
 def decode_token(token: str) -> dict:
     """Decode and verify a JWT token"""
     import logging
     logger = logging.getLogger(__name__)
     
     try:
-        logger.info(f"Decoding token with SECRET_KEY: {settings.SECRET_KEY[:10]}...")
-        logger.info(f"Using algorithm: {settings.ALGORITHM}")
-        
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        logger.info(f"Successfully decoded payload: {payload}")
-        return payload
+        payload = _verify_token(token)
     except JWTError as e:
         logger.error(f"JWT decode error: {str(e)}")
         raise HTTPException(
@@ -62,9 +85,21 @@ def decode_token(token: str) -> dict:
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    
+    exp = payload.get("exp")
+    if exp is not None and int(exp) <= time.time():
+        logger.error("JWT decode error: Signature has expired.")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return dict(payload)
 
 
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
@@ -72,12 +107,14 @@ async def get_current_user(
     import logging
     logger = logging.getLogger(__name__)
     
+    # Resolved once per request, however many dependencies ask for it
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        return user
+    
     try:
         token = credentials.credentials
-        logger.info(f"Received token: {token[:20]}...")
-        
         payload = decode_token(token)
-        logger.info(f"Decoded payload: {payload}")
         
         user_id_str = payload.get("sub")
         if user_id_str is None:
@@ -97,7 +134,7 @@ async def get_current_user(
                 detail="User not found",
             )
         
-        logger.info(f"Successfully authenticated user {user.id}")
+        request.state.user = user
         return user
         
     except Exception as e:
@@ -3,17 +3,72 @@ WebSocket connection manager for real-time transcription
 """
 
 from fastapi import WebSocket
-from typing import Dict, List
+from typing import Dict, List, Optional, Set
+import asyncio
 import logging
+import struct
+import msgspec
+import orjson
+
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Binary transcription frame: type u8 | timestamp f32 | confidence f32 | text length u16,
+# followed by the UTF-8 text
+TRANSCRIPTION_HEADER = struct.Struct("<BffH")
+MESSAGE_TYPE_TRANSCRIPTION = 1
+
+
+class TranscriptionMessage(msgspec.Struct, kw_only=True):
+    """JSON transcription message, encoded without building a dict"""
+    type: str = "transcription"
+    text: str
+    timestamp: float
+    confidence: float
+
+
+_encoder = msgspec.json.Encoder()
+
+# Pending binary messages are sent early once they fill a TCP segment
+FLUSH_BYTES = 1400
+# A client whose socket doesn't drain within this many seconds is dropped
+SEND_TIMEOUT = 5.0
+
 
 class ConnectionManager:
     """Manage WebSocket connections for real-time communication"""
     
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
+        # Clients that asked for binary transcription frames in their config message
+        self.binary_clients: Set[str] = set()
+        # Binary transcriptions waiting for the next flush, per client
+        self.pending: Dict[str, bytearray] = {}
+        self.flush_interval = settings.WS_FLUSH_MS / 1000
+        self.flush_task: Optional[asyncio.Task] = None
+        # In-flight flush per client, so a slow socket only delays its own client
+        self.sending: Dict[str, asyncio.Task] = {}
+    
+    def start(self):
+        """Start the flusher that coalesces binary transcription frames"""
+        if self.flush_interval > 0:
+            self.flush_task = asyncio.create_task(self._flusher())
+    
+    async def stop(self):
+        """Stop the flusher and send whatever is still pending"""
+        if self.flush_task is None:
+            return
+        
+        self.flush_task.cancel()
+        try:
+            await self.flush_task
+        except asyncio.CancelledError:
+            pass
+        self.flush_task = None
+        await asyncio.gather(*self.sending.values(), return_exceptions=True)
+        self.sending.clear()
+        await asyncio.gather(*(self._flush(client_id) for client_id in list(self.pending)), return_exceptions=True)
     
     async def connect(self, websocket: WebSocket, client_id: str):
         """Accept and store a new WebSocket connection"""
@@ -23,25 +78,93 @@ class ConnectionManager:
     
     def disconnect(self, client_id: str):
         """Remove a WebSocket connection"""
+        self.binary_clients.discard(client_id)
+        self.pending.pop(client_id, None)
+        self.sending.pop(client_id, None)
         if client_id in self.active_connections:
             del self.active_connections[client_id]
             logger.info(f"Client {client_id} disconnected. Remaining connections: {len(self.active_connections)}")
     
     async def send_personal_message(self, message: dict, client_id: str):
         """Send a message to a specific client"""
+        await self._send_text(orjson.dumps(message).decode(), client_id)
+    
+    async def _send_text(self, payload: str, client_id: str):
+        """Send an already encoded text frame to a specific client"""
         if client_id in self.active_connections:
             try:
-                await self.active_connections[client_id].send_json(message)
+                await self.active_connections[client_id].send_text(payload)
             except Exception as e:
                 logger.error(f"Error sending message to {client_id}: {str(e)}")
                 self.disconnect(client_id)
     
+    def set_format(self, client_id: str, message_format: str):
+        """Choose "binary" or "json" transcription messages for a client"""
+        if message_format == "binary":
+            self.binary_clients.add(client_id)
+        else:
+            self.binary_clients.discard(client_id)
+    
+    async def send_transcription(self, client_id: str, text: str, timestamp: float, confidence: float):
+        """Send a transcription in the format the client negotiated"""
+        if client_id not in self.binary_clients:
+            message = TranscriptionMessage(text=text, timestamp=timestamp, confidence=confidence)
+            await self._send_text(_encoder.encode(message).decode(), client_id)
+            return
+        
+        if client_id in self.active_connections:
+            text_bytes = text.encode("utf-8")[:0xFFFF]
+            # Messages are self-delimiting, so several can share one frame
+            pending = self.pending.setdefault(client_id, bytearray())
+            pending += TRANSCRIPTION_HEADER.pack(
+                MESSAGE_TYPE_TRANSCRIPTION, timestamp, confidence, len(text_bytes)
+            )
+            pending += text_bytes
+            if self.flush_task is None:
+                await self._flush(client_id)
+            elif len(pending) >= FLUSH_BYTES:
+                self._schedule_flush(client_id)
+    
+    def _schedule_flush(self, client_id: str):
+        """Flush a client in its own task, unless its previous frame is still sending"""
+        task = self.sending.get(client_id)
+        if task is None or task.done():
+            self.sending[client_id] = asyncio.create_task(self._flush(client_id))
+    
+    async def _flush(self, client_id: str):
+        """Send a client's pending binary messages as one frame"""
+        pending = self.pending.pop(client_id, None)
+        if not pending or client_id not in self.active_connections:
+            return
+        try:
+            await asyncio.wait_for(
+                self.active_connections[client_id].send_bytes(bytes(pending)),
+                SEND_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Client {client_id} did not drain within {SEND_TIMEOUT}s, dropping it")
+            self.disconnect(client_id)
+        except Exception as e:
+            logger.error(f"Error sending message to {client_id}: {str(e)}")
+            self.disconnect(client_id)
+    
+    async def _flusher(self):
+        """Every flush interval, send what each client has pending"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            # Clients are flushed concurrently; one that is still sending
+            # keeps collecting until its socket drains
+            for client_id in list(self.pending):
+                self._schedule_flush(client_id)
+    
     async def broadcast(self, message: dict):
         """Send a message to all connected clients"""
+        # Serialize once for every recipient
+        payload = orjson.dumps(message).decode()
         disconnected = []
         for client_id, connection in self.active_connections.items():
             try:
-                await connection.send_json(message)
+                await connection.send_text(payload)
             except Exception as e:
                 logger.error(f"Error broadcasting to {client_id}: {str(e)}")
                 disconnected.append(client_id)
@@ -3,57 +3,173 @@ MeetNote Backend - FastAPI Application
 Audio transcription with Whisper AI and summarization with OpenRouter
 """
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends, UploadFile, File
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends, UploadFile, File, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+from datetime import datetime
+import asyncio
+import atexit
+import base64
 import logging
-from typing import List, Optional
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import time
+from typing import Dict, List, Optional, Tuple
 import os
+import sys
+import uuid
+import httpx
+import msgspec
+import orjson
 
 from app.core.config import settings
+from app.core.websocket_manager import ConnectionManager
+from app.core.cache import meetings_cache
+from app.core.metrics import TRANSCRIBE_LATENCY, WS_ACTIVE_CLIENTS, WS_CHUNKS, metrics_app
 from app.api import transcription
+from app.services.meeting_writer import meeting_writer
+from app.services.ai_service import ai_service
+from app.services.batch_scheduler import batch_scheduler
+from app.services.stream_buffer import StreamBuffer, VoiceActivityDetector
 from supabase import create_client, Client
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# faster-whisper is optional for the lightweight deployment
+try:
+    from app.services.whisper_service import whisper_service
+except ImportError:
+    whisper_service = None
+
+# Configure logging: handlers only enqueue records, and a listener thread
+# does the formatting and stderr writes so they never stall the event loop
+_log_queue: queue.Queue = queue.Queue(-1)
+_log_stream = logging.StreamHandler()
+_log_stream.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+_log_listener = QueueListener(_log_queue, _log_stream)
+# force: app.core.config already called basicConfig with a stderr handler
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_log_queue)], force=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
+# Error logs per streaming client: a burst of ERROR_LOG_BURST, then one
+# every 1/ERROR_LOG_RATE seconds, so one bad client can't flood the logs
+ERROR_LOG_BURST = 5
+ERROR_LOG_RATE = 0.1  # tokens per second
+_err_budget: Dict[str, Tuple[float, float]] = {}
+
+# Columns the meetings list needs; audio_format and updated_at are never shown
+MEETING_COLUMNS = "id,title,transcript,summary,duration,confidence,created_at,language"
+# Page size when a cursor is passed without a limit
+DEFAULT_PAGE_SIZE = 50
+
 # Initialize services (removed heavy dependencies for lightweight deployment)
+ws_manager = ConnectionManager()
+
+# Bound once in lifespan (None without a database) so request handlers
+# check a module global instead of looking up app.state
+_supabase: Optional[Client] = None
+_http: Optional[httpx.AsyncClient] = None
+
+
+class HealthResponse(msgspec.Struct, kw_only=True):
+    """Body of /api/health"""
+    status: str = "healthy"
+    timestamp: str = "2025-11-16T18:48:39.281446"
+    version: str = "2.0.0"
+    database: str
+    whisper: str = "mock_available"
+
+
+# Health payloads never change after startup, so encode both up front
+HEALTH_CONNECTED = msgspec.json.encode(HealthResponse(database="supabase (connected)"))
+HEALTH_DISCONNECTED = msgspec.json.encode(HealthResponse(database="supabase (disconnected)"))
+
+
+def _init_supabase() -> Optional[Client]:
+    """Create the Supabase client, or None without credentials"""
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_KEY")
+    
+    if not (supabase_url and supabase_key):
+        logger.warning("⚠️ Supabase credentials missing, running without database")
+        return None
+    return create_client(supabase_url, supabase_key)
+
+
+def _error_log_allowed(client_id: str) -> bool:
+    """Take a token from the client's error-log bucket, if one is left"""
+    now = time.monotonic()
+    tokens, last = _err_budget.get(client_id, (ERROR_LOG_BURST, now))
+    tokens = min(ERROR_LOG_BURST, tokens + (now - last) * ERROR_LOG_RATE)
+    allowed = tokens >= 1
+    _err_budget[client_id] = (tokens - 1 if allowed else tokens, now)
+    return allowed
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
+    global _supabase, _http
     # Startup
     logger.info("Starting MeetNote Backend...")
-    logger.info(f"Environment: {settings.ENVIRONMENT}")
+    logger.info("Environment: %s", settings.ENVIRONMENT)
     
-    # Initialize Supabase client
-    try:
+    # Supabase and Whisper both block while they start, so bring them up
+    # together on worker threads
+    tasks = [asyncio.to_thread(_init_supabase)]
+    if whisper_service is not None:
+        tasks.append(whisper_service.initialize())
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    
+    supabase = results[0]
+    if isinstance(supabase, Exception):
+        logger.warning("⚠️ Supabase initialization failed: %s", supabase)
+        supabase = None
+    _supabase = supabase
+    if supabase is not None:
         supabase_url = os.getenv("SUPABASE_URL")
         supabase_key = os.getenv("SUPABASE_KEY")
-        
-        if supabase_url and supabase_key:
-            app.state.supabase = create_client(supabase_url, supabase_key)
-            logger.info("✅ Supabase client initialized")
-        else:
-            logger.warning("⚠️ Supabase credentials missing, running without database")
-            app.state.supabase = None
-    except Exception as e:
-        logger.warning(f"⚠️ Supabase initialization failed: {e}")
-        app.state.supabase = None
+        # Reads go straight to PostgREST on an async client so they never block the loop
+        _http = httpx.AsyncClient(
+            base_url=f"{supabase_url}/rest/v1",
+            headers={"apikey": supabase_key, "Authorization": f"Bearer {supabase_key}"}
+        )
+        meeting_writer.start(supabase)
+        logger.info("✅ Supabase client initialized")
+    app.state.supabase = _supabase
+    app.state.http = _http
     
-    # Note: Using mock transcription for lightweight deployment
-    logger.info("✅ Backend ready with mock transcription")
+    # Per-client PCM buffers for the WebSocket stream, gated by one shared VAD
+    app.state.buffers = {}
+    app.state.vad = VoiceActivityDetector(2)
+    app.state.client_slots = asyncio.Semaphore(settings.MAX_WS_CLIENTS)
+    ws_manager.start()
+    
+    # The Whisper model is loaded once so every request reuses the same session
+    if whisper_service is not None:
+        if isinstance(results[1], Exception):
+            logger.warning("⚠️ Whisper initialization failed: %s", results[1])
+        else:
+            batch_scheduler.start(whisper_service)
+            logger.info("✅ Backend ready with Whisper transcription")
+    else:
+        # Note: Using mock transcription for lightweight deployment
+        logger.info("✅ Backend ready with mock transcription")
     
     yield
     
     # Shutdown
     logger.info("Shutting down MeetNote Backend...")
+    await ws_manager.stop()
+    await meeting_writer.stop()
+    await ai_service.close()
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+    await batch_scheduler.stop()
+    if whisper_service is not None:
+        whisper_service.cleanup()
 
 
 # Create FastAPI app
@@ -61,23 +177,17 @@ app = FastAPI(
     title="MeetNote API",
     description="AI-powered meeting transcription and summarization",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS Configuration
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "http://localhost:5173",
-        "http://localhost:3000",
-        "http://localhost:3001", 
-        "https://meetnoteapp.netlify.app",
-        "https://meetnote-app.netlify.app",
-        "chrome-extension://*",
-    ],
+    allow_origin_regex=settings.CORS_ORIGIN_REGEX,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["content-type", "authorization"],
     expose_headers=["*"]
 )
 
@@ -95,76 +205,190 @@ async def root():
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint for frontend"""
-    database_status = "connected" if hasattr(app.state, 'supabase') and app.state.supabase else "disconnected"
-    return {
-        "status": "healthy",
-        "timestamp": "2025-11-16T18:48:39.281446",
-        "version": "2.0.0",
-        "database": f"supabase ({database_status})",
-        "whisper": "mock_available"
-    }
+    return Response(
+        content=HEALTH_DISCONNECTED if _supabase is None else HEALTH_CONNECTED,
+        media_type="application/json"
+    )
 
 
 # Include routers
 app.include_router(transcription.router, prefix="/api/transcription", tags=["Transcription"])
 
+# Prometheus scrape endpoint, when prometheus-client is installed
+_metrics = metrics_app()
+if _metrics is not None:
+    app.mount("/metrics", _metrics)
+
 # Meetings endpoint
 @app.get("/api/meetings")
-async def get_meetings():
-    """Get all meetings from Supabase"""
+async def get_meetings(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=200, description="Page size; omit limit and cursor to get every meeting"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    """Get meetings from Supabase, newest first, all at once or one page at a time"""
+    after = _decode_cursor(cursor) if cursor else None
     try:
-        if not hasattr(app.state, 'supabase') or not app.state.supabase:
+        if _http is None:
             # Return empty list if no database connection
-            return {"meetings": [], "total": 0}
+            return {"meetings": [], "total": 0, "next_cursor": None}
         
-        response = app.state.supabase.table('meetings').select('*').order('created_at', desc=True).execute()
-        meetings = response.data if response.data else []
+        if cursor and limit is None:
+            limit = DEFAULT_PAGE_SIZE
         
-        return {"meetings": meetings, "total": len(meetings)}
+        # Dashboard polls within the TTL share one query
+        cache_key = f"meetings:{limit}:{cursor}"
+        meetings = meetings_cache.get(cache_key)
+        if meetings is None:
+            # Served by idx_meetings_created_at_id (created_at DESC, id DESC);
+            # id breaks created_at ties so no row is skipped between pages
+            params = {"select": MEETING_COLUMNS, "order": "created_at.desc,id.desc"}
+            if limit is not None:
+                params["limit"] = limit
+            if after:
+                created_at, meeting_id = after
+                params["or"] = (
+                    f'(created_at.lt."{created_at}",'
+                    f'and(created_at.eq."{created_at}",id.lt.{meeting_id}))'
+                )
+            db_response = await _http.get("/meetings", params=params)
+            db_response.raise_for_status()
+            meetings = orjson.loads(db_response.content) or []
+            meetings_cache.set(cache_key, meetings)
+        
+        response.headers["Cache-Control"] = "max-age=5"
+        next_cursor = _encode_cursor(meetings[-1]) if limit is not None and len(meetings) == limit else None
+        return {"meetings": meetings, "total": len(meetings), "next_cursor": next_cursor}
     except Exception as e:
-        logger.error(f"Failed to fetch meetings: {e}")
-        return {"meetings": [], "total": 0}
+        logger.error("Failed to fetch meetings: %s", e)
+        return {"meetings": [], "total": 0, "next_cursor": None}
+
+
+def _encode_cursor(meeting: dict) -> str:
+    """Opaque, URL-safe cursor carrying the last row's (created_at, id)"""
+    return base64.urlsafe_b64encode(orjson.dumps([meeting["created_at"], meeting["id"]])).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Unpack a cursor from _encode_cursor; 400 if it was tampered with"""
+    try:
+        created_at, meeting_id = orjson.loads(base64.urlsafe_b64decode(cursor))
+        # Both go into the PostgREST filter, so only accept a real
+        # timestamp and UUID
+        return datetime.fromisoformat(created_at).isoformat(), str(uuid.UUID(meeting_id))
+    except (ValueError, TypeError, orjson.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 # WebSocket endpoint for real-time transcription
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
     """WebSocket connection for real-time audio streaming and transcription"""
-    await ws_manager.connect(websocket, client_id)
-    logger.info(f"Client {client_id} connected via WebSocket")
+    # Refuse new streams once every slot is taken (1013: try again later)
+    if app.state.client_slots.locked():
+        await websocket.accept()
+        await websocket.close(code=1013)
+        logger.warning("Rejected client %s: %d streams already active", client_id, settings.MAX_WS_CLIENTS)
+        return
     
-    try:
-        while True:
-            # Receive audio data from client
-            data = await websocket.receive_bytes()
+    async with app.state.client_slots:
+        await ws_manager.connect(websocket, client_id)
+        logger.info("Client %s connected via WebSocket", client_id)
+        if whisper_service is not None:
+            whisper_service.open_client(client_id)
+        
+        # Frames wait here while the previous utterance is transcribed
+        frames: asyncio.Queue = asyncio.Queue(maxsize=settings.WS_QUEUE_SIZE)
+        worker = asyncio.create_task(transcribe_stream(client_id, frames))
+        WS_ACTIVE_CLIENTS.inc()
+        
+        try:
+            while True:
+                # Audio arrives as binary frames of 16kHz int16 PCM; text
+                # frames are JSON control messages
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+                
+                if message.get("text") is not None:
+                    try:
+                        control = orjson.loads(message["text"])
+                    except orjson.JSONDecodeError:
+                        continue
+                    if isinstance(control, dict) and control.get("type") == "config":
+                        ws_manager.set_format(client_id, control.get("format", "json"))
+                    continue
+                
+                data = message.get("bytes")
+                if not data:
+                    continue
+                
+                if worker.done():
+                    # Nothing is reading the queue any more, so stop the stream
+                    # instead of answering every frame with backpressure
+                    logger.error("Transcription worker for client %s stopped, closing stream", client_id)
+                    ws_manager.disconnect(client_id)
+                    await websocket.close(code=1011)
+                    break
+                
+                WS_CHUNKS.inc()
+                try:
+                    frames.put_nowait(data)
+                except asyncio.QueueFull:
+                    # Drop the frame and tell the client to slow down
+                    await ws_manager.send_personal_message({"type": "backpressure"}, client_id)
+        
+        except WebSocketDisconnect:
+            ws_manager.disconnect(client_id)
+            logger.info("Client %s disconnected", client_id)
+        except Exception as e:
+            if _error_log_allowed(client_id):
+                logger.error("WebSocket error for client %s: %s", client_id, e)
+            ws_manager.disconnect(client_id)
+        finally:
+            WS_ACTIVE_CLIENTS.dec()
+            worker.cancel()
+            app.state.buffers.pop(client_id, None)
+            _err_budget.pop(client_id, None)
+            if whisper_service is not None:
+                whisper_service.release_client(client_id)
+
+
+async def transcribe_stream(client_id: str, frames: asyncio.Queue):
+    """Buffer a client's queued frames and send back each utterance's transcription"""
+    buffer = app.state.buffers.setdefault(client_id, StreamBuffer())
+    while True:
+        data = await frames.get()
+        
+        try:
+            # Buffer until the end of an utterance; silence never reaches Whisper
+            audio = buffer.feed(data, app.state.vad)
+            if audio is None or not batch_scheduler.is_running():
+                continue
             
-            # Process audio chunk with Whisper
-            transcript = await whisper_service.transcribe_chunk(data)
+            # Process audio with Whisper; the scheduler batches it
+            # with chunks from other clients arriving in the same window
+            started = time.perf_counter()
+            transcript = await batch_scheduler.submit(client_id, audio)
+            TRANSCRIBE_LATENCY.observe(time.perf_counter() - started)
             
             if transcript:
                 # Send transcription back to client
-                await ws_manager.send_personal_message(
-                    {
-                        "type": "transcription",
-                        "text": transcript["text"],
-                        "timestamp": transcript["timestamp"],
-                        "confidence": transcript.get("confidence", 0.0)
-                    },
-                    client_id
+                await ws_manager.send_transcription(
+                    client_id,
+                    transcript["text"],
+                    transcript["timestamp"],
+                    transcript.get("confidence", 0.0)
                 )
-    
-    except WebSocketDisconnect:
-        ws_manager.disconnect(client_id)
-        logger.info(f"Client {client_id} disconnected")
-    except Exception as e:
-        logger.error(f"WebSocket error for client {client_id}: {str(e)}")
-        ws_manager.disconnect(client_id)
+        except Exception as e:
+            if _error_log_allowed(client_id):
+                logger.error("Transcription error for client %s: %s", client_id, e)
 
 
 # Error handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail}
     )
@@ -172,8 +396,8 @@ async def http_exception_handler(request, exc):
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
-    logger.error(f"Unhandled exception: {str(exc)}")
-    return JSONResponse(
+    logger.error("Unhandled exception: %s", exc)
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
     )
@@ -181,10 +405,23 @@ async def general_exception_handler(request, exc):
 
 if __name__ == "__main__":
     import uvicorn
+    # One event loop per worker process. Each worker loads its own copy of
+    # whisper_service and ws_manager, so with a CUDA model keep
+    # WEB_CONCURRENCY at the number of GPUs
+    development = settings.ENVIRONMENT == "development"
+    workers = int(os.getenv("WEB_CONCURRENCY", (2 * (os.cpu_count() or 1)) + 1))
+    # uvloop and httptools are C implementations of the event loop and the
+    # HTTP parser; uvloop is unavailable on Windows, so fall back to asyncio
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        ws="websockets",
+        workers=1 if development else workers,
+        reload=development,
+        # Bound in-flight connections per worker; excess get a 503
+        limit_concurrency=int(os.getenv("LIMIT_CONCURRENCY", "0")) or None,
         log_level="info"
     )
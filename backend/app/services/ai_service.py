@@ -10,6 +10,13 @@ from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# HTTP/2 needs the optional h2 package (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 
 class AIService:
     """Service for AI-powered meeting analysis using OpenRouter"""
@@ -18,7 +25,14 @@ class AIService:
         self.api_key = settings.OPENROUTER_API_KEY
         self.base_url = settings.OPENROUTER_BASE_URL
         self.model = settings.OPENROUTER_MODEL
-        self.client = httpx.AsyncClient(timeout=60.0)
+        # One pooled client for the whole app: the TLS session to OpenRouter
+        # is reused, and with HTTP/2 concurrent summaries share a socket
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+            timeout=60.0
+        )
     
     async def summarize_transcript(self, transcript: str) -> Dict[str, Any]:
         """
@@ -72,7 +86,7 @@ Response:"""
             }
             
             response = await self.client.post(
-                f"{self.base_url}/chat/completions",
+                "/chat/completions",
                 json=payload,
                 headers=headers
             )
@@ -165,7 +179,7 @@ Response:"""
             }
             
             response = await self.client.post(
-                f"{self.base_url}/chat/completions",
+                "/chat/completions",
                 json=payload,
                 headers=headers
             )
@@ -180,3 +194,7 @@ Response:"""
     async def close(self):
         """Close HTTP client"""
         await self.client.aclose()
+
+
+# Global instance
+ai_service = AIService()
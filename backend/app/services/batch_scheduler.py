@@ -0,0 +1,143 @@
+"""
+Micro-batching scheduler for real-time transcription
+Collects streaming chunks from all WebSocket clients into batched Whisper calls
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.stream_buffer import MAX_BUFFER_BYTES, SAMPLE_RATE, SAMPLE_WIDTH
+
+logger = logging.getLogger(__name__)
+
+# Chunks are batched only with others of similar length, grouped by these
+# upper bounds in seconds; the decoder runs as many steps as the longest
+# transcript in a batch, so mixing short and long chunks wastes the rest.
+# StreamBuffer flushes by MAX_BUFFER_BYTES, so the bounds split that range
+# in thirds; anything longer shares the last bucket
+BYTES_PER_SECOND = SAMPLE_RATE * SAMPLE_WIDTH
+_MAX_SECONDS = MAX_BUFFER_BYTES / BYTES_PER_SECOND
+BUCKET_SECONDS = (_MAX_SECONDS / 3, _MAX_SECONDS * 2 / 3, _MAX_SECONDS)
+
+
+@dataclass
+class BatchItem:
+    """A queued chunk and the future its client is waiting on"""
+    client_id: str
+    audio: bytes
+    future: asyncio.Future
+    queued_at: float
+
+
+class BatchScheduler:
+    """Group queued chunks into batches for WhisperService.transcribe_batch"""
+    
+    def __init__(self):
+        self.whisper_service = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.max_batch = max(1, settings.WHISPER_BATCH_SIZE)
+        self.window = settings.WHISPER_BATCH_WINDOW_MS / 1000
+        # Chunks taken off the queue, waiting for a batch of their length
+        self.buckets: Dict[float, List[BatchItem]] = {seconds: [] for seconds in BUCKET_SECONDS}
+    
+    def start(self, whisper_service):
+        """Start batching chunks into the given Whisper service"""
+        self.whisper_service = whisper_service
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._batch_worker())
+        logger.info(f"Batch scheduler started (max {self.max_batch} chunks, {self.window * 1000:.0f}ms window)")
+    
+    def is_running(self) -> bool:
+        """Check if chunks can be submitted"""
+        return self.task is not None and not self.task.done()
+    
+    async def submit(self, client_id: str, audio: bytes) -> Optional[Dict[str, Any]]:
+        """Queue a chunk and wait for its transcription (None on failure)"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        await self.queue.put(BatchItem(client_id, audio, future, loop.time()))
+        return await future
+    
+    async def stop(self):
+        """Stop batching and release any clients still waiting"""
+        if self.task is None:
+            return
+        
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        
+        waiting = [item for bucket in self.buckets.values() for item in bucket]
+        while not self.queue.empty():
+            waiting.append(self.queue.get_nowait())
+        for item in waiting:
+            if not item.future.done():
+                item.future.set_result(None)
+        for bucket in self.buckets.values():
+            bucket.clear()
+        logger.info("Batch scheduler stopped")
+    
+    def _bucket(self, item: BatchItem) -> List[BatchItem]:
+        """Put a chunk into the bucket for its length and return that bucket"""
+        seconds = len(item.audio) / BYTES_PER_SECOND
+        key = next((bound for bound in BUCKET_SECONDS if seconds <= bound), BUCKET_SECONDS[-1])
+        bucket = self.buckets[key]
+        bucket.append(item)
+        return bucket
+    
+    async def _batch_worker(self):
+        """Serve the bucket with the oldest chunk, gathering more until its window closes"""
+        loop = asyncio.get_running_loop()
+        while True:
+            if not any(self.buckets.values()):
+                self._bucket(await self.queue.get())
+            
+            bucket = min((b for b in self.buckets.values() if b), key=lambda b: b[0].queued_at)
+            deadline = bucket[0].queued_at + self.window
+            while len(bucket) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                # A different bucket that fills up first goes out first
+                filled = self._bucket(item)
+                if len(filled) >= self.max_batch:
+                    bucket = filled
+                    break
+            
+            batch = bucket[:self.max_batch]
+            del bucket[:self.max_batch]
+            results: List[Optional[Dict[str, Any]]] = [None] * len(batch)
+            try:
+                results = await self._transcribe(batch)
+            finally:
+                # Always resolve, so clients are released even on shutdown;
+                # the client may also have disconnected while the batch ran
+                for item, result in zip(batch, results):
+                    if not item.future.done():
+                        item.future.set_result(result)
+    
+    async def _transcribe(self, batch: List[BatchItem]) -> List[Optional[Dict[str, Any]]]:
+        """Transcribe a batch; a failure yields None for every chunk"""
+        try:
+            return await self.whisper_service.transcribe_batch(
+                [item.audio for item in batch],
+                [item.client_id for item in batch]
+            )
+        except Exception as e:
+            logger.error(f"Batch transcription error ({len(batch)} chunks): {str(e)}")
+            return [None] * len(batch)
+
+
+# Global instance
+batch_scheduler = BatchScheduler()
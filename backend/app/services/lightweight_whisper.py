@@ -7,7 +7,8 @@ import os
 import logging
 from typing import Optional
 import tempfile
-import base64
+
+from app.core.encoding import b64decode
 
 logger = logging.getLogger(__name__)
 
@@ -46,22 +47,27 @@ class LightweightWhisperService:
         return self.is_initialized and self.model is not None
     
     async def transcribe_audio(self, audio_base64: str) -> dict:
-        """Transcribe audio with memory optimization"""
+        """Transcribe audio with memory optimization; raises if it can't"""
         if not self.is_ready():
-            return self._mock_transcription(len(audio_base64))
+            raise RuntimeError("Whisper model not initialized")
         
         try:
             # Decode base64 audio
-            audio_data = base64.b64decode(audio_base64)
+            audio_data = b64decode(audio_base64)
             
             # Create temporary file (automatically cleaned up)
             with tempfile.NamedTemporaryFile(suffix=".webm", delete=True) as temp_file:
                 temp_file.write(audio_data)
                 temp_file.flush()
                 
+                # Decode once so the duration comes from the real sample
+                # count rather than the compressed size
+                import whisper
+                audio = whisper.load_audio(temp_file.name)
+                
                 # Transcribe with memory-efficient settings
                 result = self.model.transcribe(
-                    temp_file.name,
+                    audio,
                     fp16=False,  # Use fp32 for CPU (more compatible)
                     language="en",  # Specify language to save processing
                     task="transcribe",  # Only transcribe, don't translate
@@ -71,34 +77,13 @@ class LightweightWhisperService:
                 return {
                     "transcript": result["text"].strip(),
                     "language": result.get("language", "en"),
-                    "duration": len(audio_data) // 1000,  # Rough estimate
+                    "duration": round(len(audio) / whisper.audio.SAMPLE_RATE),
                     "confidence": 0.85  # Whisper doesn't provide confidence
                 }
                 
         except Exception as e:
             logger.error(f"Whisper transcription failed: {e}")
-            return self._mock_transcription(len(audio_base64))
-    
-    def _mock_transcription(self, audio_size: int) -> dict:
-        """Fallback mock transcription"""
-        estimated_duration = max(5, min(300, audio_size // 1000))
-        
-        if estimated_duration < 30:
-            transcript = "Hello, this is a brief test recording for the MeetNote application."
-            confidence = 0.75
-        elif estimated_duration < 120:
-            transcript = "This is a meeting recording. We discussed the project progress, reviewed the current status, and planned next steps for the upcoming sprint."
-            confidence = 0.85
-        else:
-            transcript = "This is a comprehensive meeting recording. We covered multiple topics including project updates, technical discussions, resource allocation, and strategic planning. The team reviewed current progress and identified key action items for the next phase."
-            confidence = 0.90
-        
-        return {
-            "transcript": transcript,
-            "language": "en",
-            "duration": estimated_duration,
-            "confidence": confidence
-        }
+            raise
     
     def cleanup(self):
         """Clean up resources"""
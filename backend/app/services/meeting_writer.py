@@ -0,0 +1,94 @@
+"""
+Background writer that batches meeting inserts into Supabase
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.core.cache import meetings_cache
+
+logger = logging.getLogger(__name__)
+
+# Meetings waiting to be written; handlers wait once this is full
+QUEUE_SIZE = 1000
+# A batch is flushed after collecting for this long, or once it is full
+FLUSH_INTERVAL = 0.1  # seconds
+BATCH_SIZE = 50
+
+
+class MeetingWriter:
+    """Queue meeting rows and insert them into Supabase in batches"""
+    
+    def __init__(self):
+        self.supabase = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+    
+    def start(self, supabase):
+        """Start draining the queue into the given Supabase client"""
+        self.supabase = supabase
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.task = asyncio.create_task(self._drain())
+        logger.info("Meeting writer started")
+    
+    def is_running(self) -> bool:
+        """Check if meetings can be queued"""
+        return self.task is not None and not self.task.done()
+    
+    async def enqueue(self, meeting: Dict[str, Any]):
+        """Queue a meeting for the next batch insert"""
+        await self.queue.put(meeting)
+    
+    async def stop(self):
+        """Flush queued meetings and stop the writer"""
+        if not self.is_running():
+            return
+        
+        # None tells the drain loop to flush what it has and exit
+        await self.queue.put(None)
+        await self.task
+        self.task = None
+        logger.info("Meeting writer stopped")
+    
+    async def _drain(self):
+        """Collect meetings for FLUSH_INTERVAL and insert them together"""
+        while True:
+            batch: List[Dict[str, Any]] = []
+            meeting = await self.queue.get()
+            
+            if meeting is not None:
+                batch.append(meeting)
+                await asyncio.sleep(FLUSH_INTERVAL)
+                while len(batch) < BATCH_SIZE and not self.queue.empty():
+                    meeting = self.queue.get_nowait()
+                    if meeting is None:
+                        break
+                    batch.append(meeting)
+            
+            if batch:
+                await self._insert(batch)
+            if meeting is None:
+                return
+    
+    async def _insert(self, batch: List[Dict[str, Any]]):
+        """Insert a batch in one request; errors are logged, not raised"""
+        try:
+            # The Supabase client is synchronous, so keep it off the event loop
+            response = await asyncio.to_thread(
+                lambda: self.supabase.table('meetings').insert(batch).execute()
+            )
+            
+            if response.data:
+                meetings_cache.clear()
+                logger.info(f"✅ Stored {len(batch)} meetings in Supabase")
+            else:
+                logger.error(f"❌ Failed to store {len(batch)} meetings - no data returned")
+                logger.error(f"❌ Response details: {response}")
+        except Exception as db_error:
+            logger.error(f"💥 Database error storing {len(batch)} meetings: {db_error}")
+            logger.error(f"💥 Meeting ids: {[m.get('id') for m in batch]}")
+
+
+# Global instance
+meeting_writer = MeetingWriter()
@@ -0,0 +1,107 @@
+"""
+Per-client audio buffering with voice activity detection
+Streams arrive as 16-bit little-endian PCM at 16kHz; only speech is sent to Whisper
+"""
+
+import logging
+import math
+import sys
+from array import array
+from typing import Optional
+
+# webrtcvad is optional; fall back to an energy threshold without it
+try:
+    import webrtcvad
+    WEBRTCVAD_AVAILABLE = True
+except ImportError:
+    WEBRTCVAD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # bytes per int16 sample
+FRAME_MS = 30
+FRAME_BYTES = SAMPLE_RATE * FRAME_MS // 1000 * SAMPLE_WIDTH
+
+# Flush after this much trailing silence, or once the buffer is this long
+SILENCE_FLUSH_MS = 300
+MAX_BUFFER_BYTES = SAMPLE_RATE * 3 * SAMPLE_WIDTH
+# Audio kept after a flush so the next utterance starts with some context
+TAIL_BYTES = SAMPLE_RATE * 200 // 1000 * SAMPLE_WIDTH
+
+# RMS of a speech frame, for the energy fallback (int16 full scale is 32768)
+ENERGY_THRESHOLD = 500
+
+
+class VoiceActivityDetector:
+    """Classify 30ms PCM frames as speech or silence"""
+
+    def __init__(self, aggressiveness: int = 2):
+        self.vad = webrtcvad.Vad(aggressiveness) if WEBRTCVAD_AVAILABLE else None
+        if self.vad is None:
+            logger.info("webrtcvad not installed, using energy threshold for VAD")
+
+    def is_speech(self, frame: memoryview) -> bool:
+        """Check one FRAME_BYTES frame"""
+        if self.vad is not None:
+            return self.vad.is_speech(bytes(frame), SAMPLE_RATE)
+        # 480 samples per frame, cheap enough in pure Python; numpy is not
+        # installed in the lightweight image
+        samples = array("h")
+        samples.frombytes(frame)
+        if sys.byteorder == "big":
+            samples.byteswap()
+        return math.sqrt(sum(s * s for s in samples) / len(samples)) >= ENERGY_THRESHOLD
+
+
+class StreamBuffer:
+    """Rolling PCM buffer for one client, flushed at the end of each utterance"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        # Bytes already run through the VAD
+        self.scanned = 0
+        self.has_speech = False
+        self.silence_ms = 0
+
+    def feed(self, data: bytes, vad: VoiceActivityDetector) -> Optional[bytes]:
+        """
+        Append audio and return the buffered utterance once it is ready
+
+        Args:
+            data: PCM bytes from the client
+            vad: Shared voice activity detector
+
+        Returns:
+            The audio to transcribe, or None while still collecting
+        """
+        self.buffer.extend(data)
+
+        # Frames are views into the buffer; every view must be released
+        # before _keep_tail resizes it, or the bytearray raises BufferError
+        with memoryview(self.buffer) as view:
+            while self.scanned + FRAME_BYTES <= len(view):
+                with view[self.scanned:self.scanned + FRAME_BYTES] as frame:
+                    speech = vad.is_speech(frame)
+                self.scanned += FRAME_BYTES
+                if speech:
+                    self.has_speech = True
+                    self.silence_ms = 0
+                else:
+                    self.silence_ms += FRAME_MS
+
+        end_of_utterance = self.has_speech and self.silence_ms >= SILENCE_FLUSH_MS
+        if end_of_utterance or len(self.buffer) >= MAX_BUFFER_BYTES:
+            audio = bytes(self.buffer) if self.has_speech else None
+            self._keep_tail()
+            return audio
+        return None
+
+    def _keep_tail(self):
+        """Drop everything but the last TAIL_BYTES, aligned to whole samples"""
+        tail = min(len(self.buffer), TAIL_BYTES)
+        tail -= tail % SAMPLE_WIDTH
+        del self.buffer[:len(self.buffer) - tail]
+        self.scanned = 0
+        self.has_speech = False
+        self.silence_ms = 0
@@ -4,30 +4,90 @@ Uses faster-whisper for efficient CPU inference
 """
 
 import os
+import time
 import logging
 import asyncio
-from typing import Optional, Dict, Any
-import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Set, Union, BinaryIO
 import numpy as np
+import ctranslate2
 from faster_whisper import WhisperModel
+from faster_whisper.tokenizer import Tokenizer
 import soundfile as sf
 from io import BytesIO
 
+# Batched pipeline ships with faster-whisper >= 1.1
+try:
+    from faster_whisper import BatchedInferencePipeline
+    BATCHED_AVAILABLE = True
+except ImportError:
+    BATCHED_AVAILABLE = False
+
+# torch is optional; it is only used to build mel batches on the GPU
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
 from app.core.config import settings
+from app.core.encoding import b64decode
 
 logger = logging.getLogger(__name__)
 
+# Characters of previous transcript kept per streaming client
+STREAM_CONTEXT_CHARS = 200
+
+# Compute types to try, fastest first, when the configured one is not
+# supported by the device's kernels
+COMPUTE_TYPE_FALLBACKS = {
+    "cpu": ["int8", "int8_float32", "float32"],
+    "cuda": ["int8_float16", "float16", "int8", "float32"],
+}
+
+
+def resolve_compute_type(device: str, requested: str) -> str:
+    """Pick the requested compute type if the hardware supports it"""
+    supported = ctranslate2.get_supported_compute_types(device)
+    if requested in supported:
+        return requested
+    
+    for compute_type in COMPUTE_TYPE_FALLBACKS.get(device, []):
+        if compute_type in supported:
+            logger.warning(f"Compute type {requested} not supported on {device}, using {compute_type}")
+            return compute_type
+    return "default"
+
 
 class WhisperService:
     """Service for audio transcription using Whisper AI"""
     
     def __init__(self):
         self.model: Optional[WhisperModel] = None
+        # Splits long recordings into VAD segments decoded as one batch
+        self.batched_pipeline = None
         self.ready = False
-        self.lock = asyncio.Lock()
+        # Inference runs on a bounded pool so it never blocks the event loop;
+        # one thread per CTranslate2 worker
+        self.executor: Optional[ThreadPoolExecutor] = None
+        # Mel filterbank and STFT window kept on the GPU for batched features
+        self.mel_filters = None
+        self.hann_window = None
+        # Tail of the last transcript per streaming client, used as the
+        # decoder prompt for the next chunk
+        self._contexts: Dict[str, str] = {}
+        # Clients still connected; a batch that finishes after its client
+        # left must not put the context back
+        self._active: Set[str] = set()
     
     async def initialize(self):
         """Initialize the Whisper model"""
+        # Loading reads the weights from disk (and uploads them to the GPU),
+        # so keep it off the event loop
+        await asyncio.to_thread(self._load_model)
+    
+    def _load_model(self):
+        """Load the model and set up inference state on a worker thread"""
         try:
             logger.info(f"Loading Whisper model: {settings.WHISPER_MODEL}")
             
@@ -35,31 +95,99 @@ class WhisperService:
             # Models: tiny, base, small, medium, large-v2, large-v3
             # Device: cpu or cuda
             # Compute type: int8, float16, float32
+            #
+            # CTranslate2 converts the weights once at load time and runs
+            # fused, int8-quantized kernels, so the model is loaded here at
+            # startup and reused for every request.
+            num_workers = max(1, settings.WHISPER_NUM_WORKERS)
+            cpu_threads = settings.WHISPER_CPU_THREADS or max(1, (os.cpu_count() or 1) // num_workers)
+            # CTranslate2 dispatches int8 GEMMs to VNNI / AVX-512 kernels
+            # on x86 and to Ruy on ARM when the CPU supports them
+            compute_type = resolve_compute_type(settings.WHISPER_DEVICE, settings.WHISPER_COMPUTE_TYPE)
             self.model = WhisperModel(
                 settings.WHISPER_MODEL,
                 device=settings.WHISPER_DEVICE,
-                compute_type=settings.WHISPER_COMPUTE_TYPE
+                compute_type=compute_type,
+                cpu_threads=cpu_threads,
+                num_workers=num_workers
             )
+            if BATCHED_AVAILABLE and settings.WHISPER_FILE_BATCH_SIZE > 1:
+                self.batched_pipeline = BatchedInferencePipeline(model=self.model)
+            
+            self.executor = ThreadPoolExecutor(
+                max_workers=num_workers,
+                thread_name_prefix="whisper"
+            )
+            
+            if settings.WHISPER_DEVICE == "cuda" and TORCH_AVAILABLE and torch.cuda.is_available():
+                # Allow TF32 for the float32 mel matmuls on Ampere and newer
+                torch.set_float32_matmul_precision("high")
+                extractor = self.model.feature_extractor
+                self.mel_filters = torch.from_numpy(extractor.mel_filters).to("cuda", dtype=torch.float32)
+                self.hann_window = torch.hann_window(extractor.n_fft, device="cuda")
+                logger.info("Streaming mel spectrograms will be computed on the GPU")
+            
+            self._warmup()
             
             self.ready = True
-            logger.info("Whisper model loaded successfully")
+            logger.info(
+                f"Whisper model loaded successfully "
+                f"({compute_type}, {num_workers} workers x {cpu_threads} CPU threads)"
+            )
             
         except Exception as e:
             logger.error(f"Failed to load Whisper model: {str(e)}")
             self.ready = False
             raise
     
+    def _warmup(self):
+        """
+        Decode one silent 30s window before serving requests
+        
+        The first generate call allocates CTranslate2's buffers (and
+        initializes CUDA kernels), which would otherwise land on the first
+        streaming client. Batches always use the same [n_mels, 3000] window,
+        so this covers the shape every request runs with.
+        """
+        extractor = self.model.feature_extractor
+        features = np.zeros(
+            (1, extractor.mel_filters.shape[0], extractor.nb_max_frames),
+            dtype=np.float32
+        )
+        tokenizer = Tokenizer(
+            self.model.hf_tokenizer,
+            self.model.model.is_multilingual,
+            task="transcribe",
+            language="en"
+        )
+        
+        started = time.perf_counter()
+        self.model.model.generate(
+            ctranslate2.StorageView.from_array(features),
+            [self._build_prompt(tokenizer, None)],
+            beam_size=1,
+            max_length=8
+        )
+        logger.info(f"Whisper warmup took {(time.perf_counter() - started) * 1000:.0f}ms")
+    
     def is_ready(self) -> bool:
         """Check if model is ready"""
         return self.ready and self.model is not None
     
-    async def transcribe_file(self, audio_path: str, language: str = "en") -> Dict[str, Any]:
+    async def transcribe_file(
+        self,
+        audio: Union[str, BinaryIO, np.ndarray],
+        language: str = "en",
+        **options
+    ) -> Dict[str, Any]:
         """
         Transcribe an audio file
         
         Args:
-            audio_path: Path to audio file
+            audio: Path to audio file, in-memory file object, or 16kHz
+                float32 samples
             language: Language code (e.g., 'en', 'es', 'fr')
+            **options: Overrides for the faster-whisper decoding options
         
         Returns:
             Dictionary with transcription results
@@ -67,79 +195,202 @@ class WhisperService:
         if not self.is_ready():
             raise RuntimeError("Whisper model not initialized")
         
+        decode_options = dict(
+            beam_size=5,
+            vad_filter=True,  # Voice Activity Detection
+            vad_parameters=dict(min_silence_duration_ms=500)
+        )
+        decode_options.update(options)
+        
         try:
-            async with self.lock:
-                # Transcribe with faster-whisper
-                segments, info = self.model.transcribe(
-                    audio_path,
-                    language=language,
-                    beam_size=5,
-                    vad_filter=True,  # Voice Activity Detection
-                    vad_parameters=dict(min_silence_duration_ms=500)
-                )
-                
-                # Collect all segments
-                full_text = []
-                transcript_segments = []
-                
-                for segment in segments:
-                    full_text.append(segment.text)
-                    transcript_segments.append({
-                        "start": segment.start,
-                        "end": segment.end,
-                        "text": segment.text.strip(),
-                        "confidence": segment.avg_logprob
-                    })
-                
-                result = {
-                    "text": " ".join(full_text),
-                    "language": info.language,
-                    "language_probability": info.language_probability,
-                    "duration": info.duration,
-                    "segments": transcript_segments
-                }
-                
-                logger.info(f"Transcribed audio: {len(transcript_segments)} segments, {info.duration:.2f}s")
-                return result
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self.executor,
+                lambda: self._transcribe_sync(audio, language, decode_options)
+            )
+            
+            logger.info(f"Transcribed audio: {len(result['segments'])} segments, {result['duration']:.2f}s")
+            return result
                 
         except Exception as e:
             logger.error(f"Transcription error: {str(e)}")
             raise
     
-    async def transcribe_chunk(self, audio_data: bytes) -> Optional[Dict[str, Any]]:
+    def _transcribe_sync(self, audio, language: str, decode_options: Dict[str, Any]) -> Dict[str, Any]:
+        """Run faster-whisper on a pool thread (CTranslate2 releases the GIL)"""
+        # Transcribe with faster-whisper
+        if self.batched_pipeline is not None:
+            segments, info = self.batched_pipeline.transcribe(
+                audio,
+                language=language,
+                batch_size=settings.WHISPER_FILE_BATCH_SIZE,
+                **decode_options
+            )
+        else:
+            segments, info = self.model.transcribe(
+                audio,
+                language=language,
+                **decode_options
+            )
+        
+        # Collect all segments; decoding happens lazily while iterating
+        full_text = []
+        transcript_segments = []
+        
+        for segment in segments:
+            full_text.append(segment.text)
+            transcript_segments.append({
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text.strip(),
+                "confidence": segment.avg_logprob
+            })
+        
+        return {
+            "text": " ".join(full_text),
+            "language": info.language,
+            "language_probability": info.language_probability,
+            "duration": info.duration,
+            "segments": transcript_segments
+        }
+    
+    async def transcribe_batch(
+        self,
+        chunks: List[bytes],
+        client_ids: List[Optional[str]],
+        language: str = "en"
+    ) -> List[Dict[str, Any]]:
         """
-        Transcribe an audio chunk (for real-time streaming)
+        Transcribe several streaming chunks in one batched decoder call
+        
+        Chunks are 16-bit little-endian PCM at 16kHz, the WebSocket wire
+        format. Each one is padded to Whisper's 30s window and the mel
+        spectrograms are stacked, so CTranslate2 runs a single
+        encoder/decoder pass for the whole batch instead of one per chunk.
         
         Args:
-            audio_data: Raw audio bytes
+            chunks: PCM audio bytes, one entry per chunk
+            client_ids: Streaming client of each chunk, for decoder context
+            language: Language code
         
         Returns:
-            Dictionary with transcription or None if too short
+            One transcription dictionary per chunk, in the same order
         """
         if not self.is_ready():
             raise RuntimeError("Whisper model not initialized")
         
-        try:
-            # Save audio chunk to temporary file
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
-                tmp_path = tmp_file.name
-                tmp_file.write(audio_data)
-            
-            # Transcribe
-            result = await self.transcribe_file(tmp_path)
-            
-            # Clean up
-            os.unlink(tmp_path)
-            
-            return {
-                "text": result["text"],
-                "timestamp": result["segments"][0]["start"] if result["segments"] else 0.0,
-                "confidence": result["segments"][0]["confidence"] if result["segments"] else 0.0
+        prompts = [self._contexts.get(client_id) if client_id else None for client_id in client_ids]
+        
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(
+            self.executor,
+            lambda: self._transcribe_batch_sync(chunks, prompts, language)
+        )
+        
+        for client_id, result in zip(client_ids, results):
+            self._remember(client_id, result["text"])
+        return results
+    
+    def _transcribe_batch_sync(
+        self,
+        chunks: List[bytes],
+        prompts: List[Optional[str]],
+        language: str
+    ) -> List[Dict[str, Any]]:
+        """Build the padded mel batch and decode it greedily on a pool thread"""
+        if self.mel_filters is not None:
+            features = self._gpu_batch_features(chunks)
+        else:
+            waveforms = self._pcm_windows(chunks, np.float32)
+            waveforms *= 1 / 32768.0
+            extractor = self.model.feature_extractor
+            features = np.ascontiguousarray(
+                np.stack([extractor(row)[:, :extractor.nb_max_frames] for row in waveforms])
+            )
+        
+        tokenizer = Tokenizer(
+            self.model.hf_tokenizer,
+            self.model.model.is_multilingual,
+            task="transcribe",
+            language=language
+        )
+        
+        outputs = self.model.model.generate(
+            ctranslate2.StorageView.from_array(features),
+            [self._build_prompt(tokenizer, prompt) for prompt in prompts],
+            beam_size=1,
+            max_length=448,
+            return_scores=True,
+            suppress_blank=True,
+            suppress_tokens=[-1]
+        )
+        
+        return [
+            {
+                "text": tokenizer.decode(
+                    [token for token in output.sequences_ids[0] if token < tokenizer.eot]
+                ).strip(),
+                "timestamp": 0.0,
+                "confidence": output.scores[0] if output.scores else 0.0
             }
-            
-        except Exception as e:
-            logger.error(f"Chunk transcription error: {str(e)}")
-            return None
+            for output in outputs
+        ]
+    
+    def _pcm_windows(self, chunks: List[bytes], dtype) -> np.ndarray:
+        """
+        Decode PCM chunks straight into one zero-padded [B, n_samples] array
+        
+        np.frombuffer views each chunk without copying it, and the samples
+        are written once into their row; chunks longer than 30s are trimmed.
+        """
+        n_samples = self.model.feature_extractor.n_samples
+        waveforms = np.zeros((len(chunks), n_samples), dtype=dtype)
+        for row, chunk in zip(waveforms, chunks):
+            count = min(len(chunk) // 2, n_samples)
+            row[:count] = np.frombuffer(chunk, dtype="<i2", count=count)
+        return waveforms
+    
+    def _gpu_batch_features(self, chunks: List[bytes]) -> "torch.Tensor":
+        """
+        Log-mel spectrograms for the whole batch in one pass on the GPU
+        
+        Same transform as the CPU feature extractor, but the STFT and the
+        filterbank matmul run once over a [B, samples] tensor instead of
+        per chunk in NumPy. Samples are uploaded as int16, half the bytes
+        of float32, and scaled on the device. Filters stay float32: log10
+        of the 1e-10 clamp underflows in float16.
+        """
+        extractor = self.model.feature_extractor
+        pcm = torch.from_numpy(self._pcm_windows(chunks, np.int16)).pin_memory()
+        waveforms = pcm.to("cuda", non_blocking=True).to(torch.float32).mul_(1 / 32768.0)
+        stft = torch.stft(
+            waveforms,
+            extractor.n_fft,
+            extractor.hop_length,
+            window=self.hann_window,
+            return_complex=True
+        )
+        magnitudes = stft[..., :-1].abs().pow_(2)
+        mel_spec = self.mel_filters @ magnitudes
+        
+        log_spec = torch.clamp(mel_spec, min=1e-10).log10_()
+        log_spec = torch.maximum(log_spec, log_spec.amax(dim=(1, 2), keepdim=True) - 8.0)
+        return ((log_spec + 4.0) / 4.0).contiguous()
+    
+    @staticmethod
+    def _build_prompt(tokenizer: Tokenizer, previous_text: Optional[str]) -> List[int]:
+        """Decoder prompt: optional previous text, then the task tokens"""
+        prompt = []
+        if previous_text:
+            # Whisper allows previous-text tokens to fill half the context
+            prompt = [tokenizer.sot_prev] + tokenizer.encode(" " + previous_text.strip())[-223:]
+        return prompt + list(tokenizer.sot_sequence) + [tokenizer.no_timestamps]
+    
+    def _remember(self, client_id: Optional[str], text: str):
+        """Keep the tail of a client's transcript as its next decoder prompt"""
+        if client_id in self._active and text:
+            context = self._contexts.get(client_id, "") + text
+            self._contexts[client_id] = context[-STREAM_CONTEXT_CHARS:]
     
     async def transcribe_base64(self, base64_audio: str, language: str = "en") -> Dict[str, Any]:
         """
@@ -152,24 +403,34 @@ class WhisperService:
         Returns:
             Dictionary with transcription results
         """
-        import base64
+        # Decode base64 and hand the bytes to the decoder in memory
+        audio_bytes = b64decode(base64_audio)
         
-        # Decode base64
-        audio_bytes = base64.b64decode(base64_audio)
-        
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
-            tmp_path = tmp_file.name
-            tmp_file.write(audio_bytes)
-        
-        try:
-            result = await self.transcribe_file(tmp_path, language)
-            return result
-        finally:
-            os.unlink(tmp_path)
+        return await self.transcribe_file(BytesIO(audio_bytes), language)
+    
+    def open_client(self, client_id: str):
+        """Start keeping streaming context for a newly connected client"""
+        self._active.add(client_id)
+    
+    def release_client(self, client_id: str):
+        """Drop the streaming context kept for a client"""
+        self._active.discard(client_id)
+        self._contexts.pop(client_id, None)
     
     def cleanup(self):
         """Clean up resources"""
+        self._contexts.clear()
+        self._active.clear()
+        self.mel_filters = None
+        self.hann_window = None
+        self.batched_pipeline = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
         self.model = None
         self.ready = False
         logger.info("Whisper service cleaned up")
+
+
+# Global instance
+whisper_service = WhisperService()
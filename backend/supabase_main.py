@@ -6,6 +6,7 @@ Real Whisper transcription + Supabase database
 
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Optional
 import os
@@ -15,7 +16,9 @@ from datetime import datetime
 import asyncio
 import tempfile
 import subprocess
-import base64
+
+from app.core.config import settings
+from app.core.encoding import b64decode
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
@@ -29,7 +32,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="MeetNote Backend (Supabase + Whisper)",
     description="Real speech transcription with Supabase database",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Supabase client
@@ -46,17 +50,10 @@ else:
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "http://localhost:5173",
-        "http://localhost:3000",
-        "http://localhost:3001", 
-        "https://meetnoteapp.netlify.app",
-        "https://meetnote-app.netlify.app",
-        "chrome-extension://*",
-    ],
+    allow_origin_regex=settings.CORS_ORIGIN_REGEX,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["content-type", "authorization"],
 )
 
 # Pydantic models
@@ -102,7 +99,7 @@ async def transcribe_audio(request: AudioRequest):
         
         # Decode base64 audio
         try:
-            audio_bytes = base64.b64decode(request.audio_data)
+            audio_bytes = b64decode(request.audio_data)
             logger.info(f"Decoded audio size: {len(audio_bytes)} bytes")
         except Exception as e:
             logger.error(f"Failed to decode audio: {e}")
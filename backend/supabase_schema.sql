@@ -25,7 +25,9 @@ CREATE TABLE IF NOT EXISTS users (
 );
 
 -- Create indexes for better performance
-CREATE INDEX IF NOT EXISTS idx_meetings_created_at ON meetings(created_at DESC);
+-- Keyset pagination orders by (created_at, id), so id breaks created_at ties
+DROP INDEX IF EXISTS idx_meetings_created_at;
+CREATE INDEX IF NOT EXISTS idx_meetings_created_at_id ON meetings(created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_meetings_title ON meetings(title);
 
 -- Enable Row Level Security (RLS)
@@ -0,0 +1,18 @@
+"""
+Tests for the application's logging setup
+"""
+
+import logging
+from logging.handlers import QueueHandler
+
+import pytest
+
+main = pytest.importorskip("app.main")
+
+
+def test_root_logger_only_enqueues_records():
+    handlers = logging.getLogger().handlers
+
+    assert any(isinstance(handler, QueueHandler) for handler in handlers)
+    # Writes to stderr happen on the listener thread, not through the root logger
+    assert not any(type(handler) is logging.StreamHandler for handler in handlers)
@@ -0,0 +1,53 @@
+"""
+Tests for per-client stream buffering
+"""
+
+from app.services.stream_buffer import (
+    FRAME_BYTES,
+    MAX_BUFFER_BYTES,
+    SILENCE_FLUSH_MS,
+    FRAME_MS,
+    TAIL_BYTES,
+    StreamBuffer,
+)
+
+
+class FakeVAD:
+    """Treat any frame with a non-zero byte as speech"""
+
+    def is_speech(self, frame) -> bool:
+        return any(frame)
+
+
+SPEECH = b"\x01\x00" * (FRAME_BYTES // 2)
+SILENCE = bytes(FRAME_BYTES)
+
+
+def test_flushes_utterance_after_trailing_silence():
+    buffer = StreamBuffer()
+    vad = FakeVAD()
+    silence_frames = SILENCE_FLUSH_MS // FRAME_MS
+
+    assert buffer.feed(SPEECH * 5, vad) is None
+    audio = buffer.feed(SILENCE * silence_frames, vad)
+
+    assert audio == SPEECH * 5 + SILENCE * silence_frames
+    assert len(buffer.buffer) == TAIL_BYTES
+    assert buffer.scanned == 0 and not buffer.has_speech
+
+
+def test_buffer_keeps_working_after_a_flush():
+    buffer = StreamBuffer()
+    vad = FakeVAD()
+    silence = SILENCE * (SILENCE_FLUSH_MS // FRAME_MS)
+
+    assert buffer.feed(SPEECH + silence, vad) is not None
+    # The kept tail is not frame-aligned, so allow an extra frame of silence
+    assert buffer.feed(SPEECH + silence + SILENCE, vad) is not None
+
+
+def test_silence_is_dropped_at_max_length():
+    buffer = StreamBuffer()
+
+    assert buffer.feed(bytes(MAX_BUFFER_BYTES), FakeVAD()) is None
+    assert len(buffer.buffer) == TAIL_BYTES